@@ -1,6 +1,4 @@
 
-=======
-
 import argparse
 import os
 import sys
@@ -28,6 +26,11 @@ def main():
         default="sample_output/raw",
         help="Output directory for raw JSON files"
     )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile regex extraction per field/pattern and save extraction_profile.json"
+    )
     
     args = parser.parse_args()
     
@@ -44,7 +47,7 @@ def main():
     
     try:
         
-        from utils import run_dolphin_on_folder, parse_invoices, save_outputs
+        from utils import run_dolphin_on_folder, parse_invoices, save_outputs, ExtractionProfiler
         
         # Validate inputs
         if not os.path.exists(args.in_dir):
@@ -87,11 +90,17 @@ def main():
             return
         
         logger.info(f"Parsing {len(raw_data)} invoices...")
-        header_data, line_items = parse_invoices(raw_data)
+        profiler = ExtractionProfiler() if args.profile else None
+        header_data, line_items = parse_invoices(raw_data, profiler=profiler)
         
         logger.info("Saving structured CSV and JSON outputs...")
         save_outputs(header_data, line_items, args.out_csv)
         
+        if profiler is not None:
+            profile_path = Path(args.out_csv).parent / "extraction_profile.json"
+            profiler.save(str(profile_path))
+            logger.info(f"Extraction profile saved to: {profile_path}")
+        
         total_time = time.time() - start_time
         logger.info("Processing complete!")
         logger.info(f"Processed {len(header_data)} invoices in {total_time:.2f}s")
@@ -103,5 +112,4 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
->>>>>>> Stashed changes
     main()
@@ -0,0 +1,168 @@
+
+"""
+Tests for the extraction budget and per-pattern profiler
+"""
+
+import json
+import sys
+import time
+
+import utils
+from utils import CONFIG, ExtractionProfiler, parse_invoices, save_outputs
+
+def make_raw_data():
+    """Create parsed OCR data for a single invoice"""
+    return {
+        'invoice_001': {
+            'blocks': [
+                {'text': "ABC Corporation Ltd\nInvoice #: INV-2024-001\nDate: 15/01/2024\n"},
+                {'text': "Grand Total: USD 1,250.00"},
+            ]
+        }
+    }
+
+def test_parse_invoices_within_budget():
+    """Test fields are extracted and profiled under the output column names"""
+    profiler = ExtractionProfiler()
+    headers, _ = parse_invoices(make_raw_data(), profiler=profiler)
+
+    header = headers[0]
+    assert header['status'] == 'success'
+    assert header['vendor_name'] == 'ABC Corporation Ltd'
+    assert header['invoice_no'] == 'INV-2024-001'
+    assert header['grand_total'] == '1,250.00'
+    assert profiler.budget_exceeded == []
+    assert {row['field'] for row in profiler.report(top_n=50)} == {
+        'vendor_name', 'invoice_no', 'invoice_date', 'currency', 'grand_total'
+    }
+
+def test_parse_invoices_budget_exceeded(monkeypatch):
+    """Test an exhausted budget falls back to defaults and marks the row partial"""
+    monkeypatch.setitem(CONFIG, 'extraction_budget', 0)
+    profiler = ExtractionProfiler()
+    headers, _ = parse_invoices(make_raw_data(), profiler=profiler)
+
+    header = headers[0]
+    assert header['status'] == 'partial'
+    assert header['vendor_name'] == 'Unknown Vendor'
+    assert header['invoice_no'] == 'INV-invoice_001'
+    assert header['currency'] == 'INR'
+    assert header['grand_total'] == '0.00'
+    assert profiler.budget_exceeded == [{'file': 'invoice_001', 'field': 'vendor_name'}]
+
+def test_total_pattern_on_whitespace_runs_within_budget():
+    """Test a long whitespace run after 'Total' does not blow up the total patterns"""
+    raw_data = {'doc': {'blocks': [{'text': 'Total' + ' ' * 19990 + 'x'}]}}
+
+    start = time.perf_counter()
+    headers, _ = parse_invoices(raw_data)
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < CONFIG['extraction_budget']
+    assert headers[0]['status'] == 'success'
+
+def test_parse_invoices_last_pattern_overrun(monkeypatch):
+    """Test a search that overruns the budget on the last field is still reported"""
+    extract_field = utils.extract_field
+
+    def slow_extract_field(text, patterns, field="", **kwargs):
+        value = extract_field(text, patterns, field=field, **kwargs)
+        if field == 'grand_total':
+            time.sleep(0.1)
+        return value
+
+    monkeypatch.setitem(CONFIG, 'extraction_budget', 0.05)
+    monkeypatch.setattr(utils, 'extract_field', slow_extract_field)
+    profiler = ExtractionProfiler()
+    headers, _ = parse_invoices(make_raw_data(), profiler=profiler)
+
+    header = headers[0]
+    assert header['status'] == 'partial'
+    assert header['vendor_name'] == 'ABC Corporation Ltd'
+    assert profiler.budget_exceeded == [{'file': 'invoice_001', 'field': 'grand_total'}]
+
+def test_parse_invoices_truncated_text(monkeypatch):
+    """Test truncating long OCR text marks the row partial"""
+    monkeypatch.setitem(CONFIG, 'max_extract_chars', 40)
+    headers, _ = parse_invoices(make_raw_data())
+
+    header = headers[0]
+    assert header['status'] == 'partial'
+    assert header['vendor_name'] == 'ABC Corporation Ltd'
+    assert header['grand_total'] == '0.00'
+
+def test_vendor_pattern_stays_on_one_line():
+    """Test the vendor pattern does not run across line breaks"""
+    raw_data = {'doc': {'blocks': [{'text': "Acme Widgets\nSecond Line\n#"}]}}
+    headers, _ = parse_invoices(raw_data)
+
+    assert headers[0]['vendor_name'] == 'Acme Widgets'
+
+def test_profiler_report():
+    """Test match rate, average time, slowest docs and ordering"""
+    profiler = ExtractionProfiler(top_docs=2)
+    profiler.record('vendor_name', 'fast', 'a', 0.1, True)
+    profiler.record('vendor_name', 'fast', 'b', 0.3, False)
+    profiler.record('vendor_name', 'fast', 'c', 0.2, True)
+    profiler.record('vendor_name', 'fast', 'd', 0.2, False)
+    profiler.record('grand_total', 'slow', 'e', 0.5, False)
+
+    report = profiler.report()
+    assert [row['pattern'] for row in report] == ['slow', 'fast']
+
+    fast = report[1]
+    assert fast['calls'] == 4
+    assert fast['match_rate'] == 0.5
+    assert fast['avg_time'] == 0.2
+    assert fast['max_time'] == 0.3
+    assert [doc['file'] for doc in fast['slowest_docs']] == ['b', 'd']
+
+    assert len(profiler.report(top_n=1)) == 1
+
+def test_profiler_save(tmp_path):
+    """Test the profile report is written as JSON"""
+    profiler = ExtractionProfiler()
+    profiler.record('currency', 'INR', 'a', 0.01, True)
+    profiler.record_budget_exceeded('b', 'currency')
+
+    out_path = tmp_path / 'extraction_profile.json'
+    profiler.save(str(out_path))
+
+    report = json.loads(out_path.read_text(encoding='utf-8'))
+    assert report['slowest_patterns'][0]['field'] == 'currency'
+    assert report['budget_exceeded'] == [{'file': 'b', 'field': 'currency'}]
+
+def test_save_outputs_counts_partial(tmp_path):
+    """Test the processing summary reports partial invoices"""
+    header_data = [
+        {'file': 'a', 'status': 'success'},
+        {'file': 'b', 'status': 'partial'},
+        {'file': 'c', 'status': 'partial'},
+    ]
+    out_csv = tmp_path / 'invoices_header.csv'
+    save_outputs(header_data, [], str(out_csv))
+
+    summary = json.loads((tmp_path / 'processing_summary.json').read_text())
+    assert summary['successful_invoices'] == 1
+    assert summary['partial_invoices'] == 2
+
+def test_cli_profile(tmp_path, monkeypatch):
+    """Test scan2csv --profile writes the extraction profile"""
+    import scan2csv
+
+    in_dir = tmp_path / 'scans'
+    in_dir.mkdir()
+    (in_dir / 'invoice_001.pdf').write_text('dummy content')
+    (tmp_path / 'hf_model').mkdir()
+    out_csv = tmp_path / 'out' / 'invoices_header.csv'
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, 'argv', [
+        'scan2csv.py', '--in_dir', str(in_dir), '--out_csv', str(out_csv),
+        '--out_json', str(tmp_path / 'out' / 'raw'), '--profile',
+    ])
+    scan2csv.main()
+
+    report = json.loads((tmp_path / 'out' / 'extraction_profile.json').read_text(encoding='utf-8'))
+    assert {row['field'] for row in report['slowest_patterns']} >= {'vendor_name', 'grand_total'}
+    assert report['budget_exceeded'] == []
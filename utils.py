@@ -12,16 +12,19 @@ import re
 import logging
 import time
 from pathlib import Path
-from typing import Dict, List, Tuple, Any
+from collections import defaultdict
+from typing import Dict, List, Tuple, Any, Optional
 
 # Configuration - single place for all constants
 CONFIG = {
     'supported_formats': ['.pdf', '.png', '.jpg', '.jpeg', '.tiff', '.bmp'],
     'timeout': 360,  # 3 minutes per document
+    'extraction_budget': 2.0,  # seconds of regex work per document in parse stage
+    'max_extract_chars': 200000,  # cap on OCR text fed to the field patterns
     'patterns': {
         'vendor_name': [
             r"(?:Vendor|From|Bill\s*From|Company)[:\s]*([^\n\r]+)",
-            r"^([A-Z][A-Za-z\s&.,'-]+(?:Ltd|Inc|Corp|LLC|Pvt)?)(?:\n|$)",
+            r"^([A-Z][A-Za-z \t&.,'-]+(?:Ltd|Inc|Corp|LLC|Pvt)?)(?:\n|$)",
             r"Invoice\s*From[:\s]*([^\n\r]+)",
         ],
         'invoice_no': [
@@ -40,12 +43,21 @@ CONFIG = {
             r"(₹|Rs\.|\$|€|£)",
         ],
         'total_amount': [
-            r"(?:Grand\s*Total|Total\s*Amount|Total\s*Due|Final\s*Total)[:\s]*(?:[₹$€£]|Rs\.?|INR|USD|EUR|GBP)?\s*([\d,]+\.?\d*)",
-            r"Total[:\s]*(?:[₹$€£]|Rs\.?|INR|USD|EUR|GBP)?\s*([\d,]+\.?\d*)",
+            r"(?:Grand\s*Total|Total\s*Amount|Total\s*Due|Final\s*Total)[:\s]*(?:(?:[₹$€£]|Rs\.?|INR|USD|EUR|GBP)\s*)?([\d,]+\.?\d*)",
+            r"Total[:\s]*(?:(?:[₹$€£]|Rs\.?|INR|USD|EUR|GBP)\s*)?([\d,]+\.?\d*)",
         ],
     }
 }
 
+# Header CSV column -> CONFIG['patterns'] key used to fill it
+HEADER_FIELDS = {
+    'vendor_name': 'vendor_name',
+    'invoice_no': 'invoice_no',
+    'invoice_date': 'invoice_date',
+    'currency': 'currency',
+    'grand_total': 'total_amount',
+}
+
 def run_dolphin_on_folder(in_dir: str, out_dir: str) -> Dict[str, Any]:
     """Run Dolphin OCR on all files in the input directory"""
     logger = logging.getLogger(__name__)
@@ -146,10 +158,78 @@ def create_mock_ocr_data(file_path: str, output_path: str):
     with open(output_path, 'w', encoding='utf-8') as f:
         json.dump(mock_data, f, indent=2)
 
-def extract_field(text: str, patterns: List[str]) -> str:
-    """Extract field using regex patterns"""
+class ExtractionProfiler:
+    """Record time and match rate per field/pattern across a corpus"""
+
+    def __init__(self, top_docs: int = 5):
+        self.top_docs = top_docs
+        self.stats = defaultdict(lambda: {'calls': 0, 'matches': 0, 'total_time': 0.0,
+                                          'max_time': 0.0, 'slowest_docs': []})
+        self.budget_exceeded = []
+
+    def record(self, field: str, pattern: str, doc: str, elapsed: float, matched: bool):
+        """Record a single pattern search"""
+        entry = self.stats[(field, pattern)]
+        entry['calls'] += 1
+        entry['matches'] += int(matched)
+        entry['total_time'] += elapsed
+        entry['max_time'] = max(entry['max_time'], elapsed)
+
+        slowest = entry['slowest_docs']
+        slowest.append((elapsed, doc))
+        slowest.sort(reverse=True)
+        del slowest[self.top_docs:]
+
+    def record_budget_exceeded(self, doc: str, field: str):
+        """Record a document whose extraction budget ran out at the given field"""
+        self.budget_exceeded.append({'file': doc, 'field': field})
+
+    def report(self, top_n: int = 10) -> List[Dict]:
+        """Return the slowest patterns with the documents that trigger them
+
+        Patterns only run when the earlier patterns for their field failed to
+        match, so calls and match_rate count the documents that reached each
+        pattern, not the whole corpus.
+        """
+        rows = []
+        for (field, pattern), entry in self.stats.items():
+            rows.append({
+                'field': field,
+                'pattern': pattern,
+                'calls': entry['calls'],
+                'match_rate': round(entry['matches'] / entry['calls'], 3) if entry['calls'] else 0.0,
+                'total_time': round(entry['total_time'], 6),
+                'avg_time': round(entry['total_time'] / entry['calls'], 6) if entry['calls'] else 0.0,
+                'max_time': round(entry['max_time'], 6),
+                'slowest_docs': [{'file': doc, 'time': round(t, 6)} for t, doc in entry['slowest_docs']],
+            })
+        rows.sort(key=lambda row: row['max_time'], reverse=True)
+        return rows[:top_n]
+
+    def save(self, out_path: str, top_n: int = 10):
+        """Save the profile report as JSON"""
+        report = {
+            'slowest_patterns': self.report(top_n),
+            'budget_exceeded': self.budget_exceeded,
+        }
+        os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+        with open(out_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+def extract_field(text: str, patterns: List[str], field: str = "", doc: str = "",
+                  profiler: Optional[ExtractionProfiler] = None,
+                  deadline: Optional[float] = None) -> str:
+    """Extract field using regex patterns, stopping once the deadline has passed"""
     for pattern in patterns:
+        # Python's re cannot be interrupted mid-search, so the budget is
+        # checked between patterns and again by the caller after each field
+        if deadline is not None and time.perf_counter() > deadline:
+            raise TimeoutError(f"Extraction budget exceeded at field '{field}'")
+
+        start = time.perf_counter()
         match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+        if profiler is not None:
+            profiler.record(field, pattern, doc, time.perf_counter() - start, bool(match))
         if match:
             return match.group(1).strip()
     return ""
@@ -193,7 +273,8 @@ def extract_line_items(text: str, filename: str) -> List[Dict]:
     
     return line_items
 
-def parse_invoices(raw_data: Dict[str, Any]) -> Tuple[List[Dict], List[Dict]]:
+def parse_invoices(raw_data: Dict[str, Any],
+                   profiler: Optional[ExtractionProfiler] = None) -> Tuple[List[Dict], List[Dict]]:
     """Parse Dolphin OCR output to extract structured invoice data"""
     logger = logging.getLogger(__name__)
     headers = []
@@ -204,18 +285,35 @@ def parse_invoices(raw_data: Dict[str, Any]) -> Tuple[List[Dict], List[Dict]]:
             
             blocks = data.get('blocks', [])
             all_text = '\n'.join(block.get('text', '') for block in blocks)
+            field_text = all_text[:CONFIG['max_extract_chars']]
             
           
-            header = {
-                'file': file_name,
-                'vendor_name': extract_field(all_text, CONFIG['patterns']['vendor_name']),
-                'invoice_no': extract_field(all_text, CONFIG['patterns']['invoice_no']),
-                'invoice_date': extract_field(all_text, CONFIG['patterns']['invoice_date']),
-                'currency': extract_field(all_text, CONFIG['patterns']['currency']),
-                'grand_total': extract_field(all_text, CONFIG['patterns']['total_amount']),
-                'processing_time': data.get('_processing_time', 0.0),
-                'status': 'success'
-            }
+            header = {'file': file_name}
+            status = 'success'
+            if len(all_text) > len(field_text):
+                logger.warning(f" {file_name}: OCR text truncated from {len(all_text)} to "
+                               f"{len(field_text)} chars for field extraction")
+                status = 'partial'
+            deadline = time.perf_counter() + CONFIG['extraction_budget']
+            for column, pattern_key in HEADER_FIELDS.items():
+                try:
+                    header[column] = extract_field(field_text, CONFIG['patterns'][pattern_key],
+                                                   field=column, doc=file_name,
+                                                   profiler=profiler, deadline=deadline)
+                    # Catch a search that overran the budget on the field's last pattern
+                    if time.perf_counter() > deadline:
+                        raise TimeoutError(f"Extraction budget exceeded at field '{column}'")
+                except TimeoutError as e:
+                    # Leave remaining fields empty so the defaults below apply
+                    logger.warning(f" {file_name}: {str(e)}, using defaults for remaining fields")
+                    if profiler is not None:
+                        profiler.record_budget_exceeded(file_name, column)
+                    status = 'partial'
+                    break
+            for column in HEADER_FIELDS:
+                header.setdefault(column, "")
+            header['processing_time'] = data.get('_processing_time', 0.0)
+            header['status'] = status
             
            
             if not header['vendor_name']:
@@ -280,6 +378,7 @@ def save_outputs(header_data: List[Dict], line_items: List[Dict], out_csv: str):
         summary = {
             'total_invoices': len(header_data),
             'successful_invoices': len([h for h in header_data if h.get('status') == 'success']),
+            'partial_invoices': len([h for h in header_data if h.get('status') == 'partial']),
             'total_line_items': len(line_items),
             'output_files': {
                 'header_csv': str(out_csv),
@@ -296,5 +395,4 @@ def save_outputs(header_data: List[Dict], line_items: List[Dict], out_csv: str):
         
     except Exception as e:
         logger.error(f" Error saving outputs: {str(e)}")
->>>>>>> Stashed changes
         raise